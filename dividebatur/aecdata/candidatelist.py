@@ -90,16 +90,15 @@ class CandidateList:
             self.group_by_id[group.group_id] = group
 
     def _load_all_candidates(self, all_candidates_csv):
-        candidates = []
         with open(all_candidates_csv, 'rt') as fd:
             reader = csv.reader(fd)
             header = next(reader)
-            for candidate in sorted(named_tuple_iter('AllCandidate', reader, header, ballot_position=int), key=lambda row: (ticket_sort_key(row.ticket), row.ballot_position)):
-                if candidate.state_ab != self.state:
-                    continue
-                if candidate.nom_ty != 'S':
-                    continue
-                candidates.append(candidate)
+            # the file lists every candidate, for both houses and all states: filter before
+            # sorting, so only this state's senate candidates are sorted
+            candidates = [
+                candidate for candidate in named_tuple_iter('AllCandidate', reader, header, ballot_position=int)
+                if candidate.state_ab == self.state and candidate.nom_ty == 'S']
+        candidates.sort(key=lambda row: (ticket_sort_key(row.ticket), row.ballot_position))
         return candidates
 
     def _load_senate_candidates(self, senate_candidates_csv):
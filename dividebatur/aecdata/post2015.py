@@ -2,6 +2,8 @@ import csv
 import gzip
 from collections import Counter
 
+from .utils import cached
+
 
 class FormalPreferences:
     "parse AEC 'formal preferences' CSV file"
@@ -10,18 +12,35 @@ class FormalPreferences:
     # has the candidates tacked on the end
     header_2019 = ['State', 'Division', 'Vote Collection Point Name', 'Vote Collection Point ID', 'Batch No', 'Paper No']
 
-    def __init__(self, csv_file, atl_n, btl_n):
+    def __init__(self, csv_file, atl_n, btl_n, cache_dir=None, max_ballots=None):
         """
         csv_file: preferences file to read
 
         candidate_count: used to build a fast lookup table for the text
         representation of preferences, and defines the highest possible
         preference that can be cast above or below the line
+
+        cache_dir: if not None, the parsed preferences are cached in this
+        directory, and re-used while the preferences file is unchanged
+
+        max_ballots: if not None, stop reading once this many ballots have been read
         """
         self._csv_file = csv_file
+        self._cache_dir = cache_dir
+        self._max_ballots = max_ballots
         self.atl_n, self.btl_n = atl_n, btl_n
 
     def __iter__(self):
+        if self._cache_dir is None:
+            return iter(self._read())
+        return iter(cached(
+            self._cache_dir,
+            'formal-preferences-%d-%d' % (self.atl_n, self.btl_n),
+            [self._csv_file],
+            lambda: list(self._read()),
+            params=self._max_ballots))
+
+    def _read(self):
         # this is a bit of a hack: it'll blow up if someone numbers a box
         # >= 1024, and the AEC enter that data in. however, it fails harmlessly
         # with an Exception, rather than introducing incorrect data into the
@@ -32,6 +51,11 @@ class FormalPreferences:
         pref_hash['/'] = 1
         pref_hash[''] = None
 
+        # distinct raw forms can decode to the same form: '*', '/' and '1' are all a first
+        # preference, and trailing empty fields may or may not be present. coalesce these,
+        # so each decoded form is only expanded once by the count.
+        decoded = Counter()
+        lookup = pref_hash.__getitem__
         with gzip.open(self._csv_file, 'rt') as fd:
             reader = csv.reader(fd)
             header = [t.strip() for t in next(reader)]
@@ -39,13 +63,33 @@ class FormalPreferences:
                 dummy = next(reader)
                 assert(dummy == ['------------', '---------------------', '---------------------', '-------', '-------', '-----------'])
                 form_count = Counter(t[5] for t in reader)
-                for form, count in form_count.items():
-                    yield tuple(pref_hash[t] for t in form.split(',')), count
+                for form, count in self._limit(form_count.items()):
+                    decoded[tuple(map(lookup, form.split(',')))] += count
             elif header[:len(self.header_2019)] == self.header_2019:
                 form_count = Counter(tuple(t[6:]) for t in reader)
-                for form, count in form_count.items():
+                for form, count in self._limit(form_count.items()):
                     # for some reason the AEC have started truncating trailing empty fields - pad.
                     missing = self.atl_n + self.btl_n - len(form)
-                    yield tuple([pref_hash[t] for t in form] + [None] * missing), count
+                    decoded[tuple(map(lookup, form)) + (None,) * missing] += count
             else:
                 raise Exception("unknown header: {}".format(header))
+        return decoded.items()
+
+    def _limit(self, raw_form_count):
+        """
+        apply max_ballots to (raw form, count) pairs. this is done before distinct raw forms are
+        coalesced, so the ballots admitted don't depend upon how the raw forms decode.
+        """
+        if self._max_ballots is None:
+            return raw_form_count
+        return limit_ballots(raw_form_count, self._max_ballots)
+
+
+def limit_ballots(raw_forms, max_ballots):
+    "yield (raw_form, count) pairs from `raw_forms`, stopping once `max_ballots` ballots have been read"
+    n_ballots = 0
+    for raw_form, count in raw_forms:
+        if n_ballots >= max_ballots:
+            return
+        yield raw_form, count
+        n_ballots += count
@@ -1,7 +1,8 @@
 import itertools
 import gzip
 import csv
-from collections import defaultdict
+from collections import Counter, defaultdict
+from operator import itemgetter
 
 from ..common import logger
 from .utils import int_or_none, named_tuple_iter, ticket_sort_key
@@ -19,19 +20,20 @@ class SenateATL:
         self.load_first_preferences(state_name, firstprefs_csv)
 
     def load_tickets(self, gvt_csv):
-        with open(gvt_csv, 'rt') as fd:
+        with open(gvt_csv, 'rt', newline='') as fd:
             reader = csv.reader(fd)
             # skip introduction line
             next(reader)
             header = next(reader)
             # note - this assume the GVT data is formal. FIXME: add a check for this.
+            # the file holds the tickets for every state: only this state's rows are sorted
             it = sorted(
-                named_tuple_iter('GvtRow', reader, header, PreferenceNo=int, TicketNo=int, CandidateID=int, OwnerTicket=lambda t: t.strip()),
-                key=lambda gvt: (gvt.State, ticket_sort_key(gvt.OwnerTicket), gvt.TicketNo, gvt.PreferenceNo))
-            for (state_ab, ticket, ticket_no), g in itertools.groupby(
-                    it, lambda gvt: (gvt.State, gvt.OwnerTicket, gvt.TicketNo)):
-                if state_ab != self.state_name:
-                    continue
+                (gvt for gvt in named_tuple_iter(
+                    'GvtRow', reader, header, PreferenceNo=int, TicketNo=int, CandidateID=int, OwnerTicket=lambda t: t.strip())
+                 if gvt.State == self.state_name),
+                key=lambda gvt: (ticket_sort_key(gvt.OwnerTicket), gvt.TicketNo, gvt.PreferenceNo))
+            for (ticket, ticket_no), g in itertools.groupby(
+                    it, lambda gvt: (gvt.OwnerTicket, gvt.TicketNo)):
                 prefs = []
                 for ticket_entry in g:
                     prefs.append(ticket_entry.CandidateID)
@@ -76,34 +78,36 @@ class SenateBTL:
     """
 
     def __init__(self, btl_csv):
-        self.ticket_votes = defaultdict(int)
+        self.ticket_votes = Counter()
         self.load_btl(btl_csv)
 
     def load_btl(self, btl_csv):
-        with gzip.open(btl_csv, 'rt') as fd:
+        # tally papers with the same preference flow in a single pass, within Counter
+        self.ticket_votes.update(self.read_flows(btl_csv))
+
+    def read_flows(self, btl_csv):
+        "yields the preference flow of each BTL paper in `btl_csv`"
+        with gzip.open(btl_csv, 'rt', newline='') as fd:
             reader = csv.reader(fd)
             next(reader)  # skip the version
-            header = next(reader)
-            it = named_tuple_iter(
-                'BtlRow',
-                reader,
-                header,
-                Batch=int,
-                Paper=int,
-                Preference=int_or_none,
-                CandidateId=int)
-            self.total_ticket_data = []
-            for key, g in itertools.groupby(it, lambda r: (r.Batch, r.Paper)):
+            header = [t.strip() for t in next(reader)]
+            # this file has a row for every preference on every BTL paper: rather than build
+            # a named tuple for each row, the four fields used are read by index
+            batch_idx, paper_idx, preference_idx, candidate_idx = (
+                header.index(t) for t in ('Batch', 'Paper', 'Preference', 'CandidateId'))
+            for key, g in itertools.groupby(reader, itemgetter(batch_idx, paper_idx)):
+                # the order of the rows within a paper doesn't matter: only a preference held
+                # by exactly one candidate is part of the flow
                 bypref = defaultdict(list)
-                for row in sorted(g, key=lambda x: x.CandidateId):
-                    bypref[row.Preference].append(row.CandidateId)
+                for row in g:
+                    bypref[int_or_none(row[preference_idx])].append(int(row[candidate_idx]))
                 flow = []
                 for pref in range(1, len(bypref) + 1):
                     at_pref = bypref.get(pref)
                     if not at_pref or len(at_pref) != 1:
                         break
                     flow.append(at_pref[0])
-                self.ticket_votes[tuple(flow)] += 1
+                yield tuple(flow)
 
     def get_tickets(self):
         for ticket in sorted(self.ticket_votes, key=lambda x: self.ticket_votes[x]):
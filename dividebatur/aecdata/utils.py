@@ -1,6 +1,17 @@
+import hashlib
+import os
+import pickle
+import tempfile
 from collections import namedtuple
 
 
+# part of the key of every cache entry written by cached(). cache entries hold the output of
+# this package's own parsing and decoding: bump this whenever that output changes (eg. the
+# expansion of forms in senatecount, or the attributes of CandidateList, SenateATL or SenateBTL),
+# so that entries written by older code are not reused.
+CACHE_VERSION = 1
+
+
 def int_or_none(s):
     if s == '':
         return None
@@ -18,12 +29,66 @@ def named_tuple_iter(name, reader, header, **kwargs):
     for field_name in kwargs:
         idx = field_names.index(field_name)
         mappings.append((idx, kwargs[field_name]))
+    # construct each row directly with tuple.__new__, bypassing the generated __new__ and
+    # its argument unpacking; the length check it would make is done here
+    n_fields = len(field_names)
+    new = tuple.__new__
     for row in reader:
+        if len(row) != n_fields:
+            raise ValueError("%s: expected %d fields, got %d" % (name, n_fields, len(row)))
         for idx, map_fn in mappings:
             row[idx] = map_fn(row[idx])
-        yield typ(*row)
+        yield new(typ, row)
 
 
 def ticket_sort_key(ticket):
     "sort key for an ATL ticket, eg. A..Z, AA..ZZ"
     return (len(ticket), ticket)
+
+
+def file_digest(path):
+    "SHA-256 hex digest of the contents of the file at `path`"
+    h = hashlib.sha256()
+    with open(path, 'rb') as fd:
+        for block in iter(lambda: fd.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cached(cache_dir, name, paths, loader, params=None):
+    """
+    returns the result of `loader()`, cached as a pickle in `cache_dir`. the cache entry
+    is keyed on CACHE_VERSION, `name`, the contents of the files in `paths`, and the repr() of
+    `params`, so it is rebuilt if any input changes. if `cache_dir` is None, `loader()` is simply called.
+    """
+    if cache_dir is None:
+        return loader()
+    key = hashlib.sha256(('%d:%s' % (CACHE_VERSION, name)).encode('utf8'))
+    for path in paths:
+        key.update(file_digest(path).encode('utf8'))
+    if params is not None:
+        key.update(repr(params).encode('utf8'))
+    cache_file = os.path.join(cache_dir, '%s-%s.pickle' % (name, key.hexdigest()))
+    try:
+        with open(cache_file, 'rb') as fd:
+            return pickle.load(fd)
+    except FileNotFoundError:
+        pass
+    except Exception:
+        # a damaged entry, or one that can't be loaded by this code (eg. written by a newer
+        # pickle protocol, or referring to a class which has moved) is treated as a miss, and
+        # rewritten
+        pass
+    obj = loader()
+    os.makedirs(cache_dir, exist_ok=True)
+    # write to a temporary file unique to this writer, then rename: concurrent writers of the
+    # same entry (counts run in parallel) can't interfere, and a reader never sees a partial entry
+    tmp_fd, tmp_file = tempfile.mkstemp(dir=cache_dir, prefix=name + '-', suffix='.tmp')
+    try:
+        with os.fdopen(tmp_fd, 'wb') as fd:
+            pickle.dump(obj, fd, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except BaseException:
+        os.unlink(tmp_file)
+        raise
+    return obj
@@ -64,6 +64,14 @@ class PapersForCount:
         """
         self.papers[ticket] += n
 
+    def add_tickets(self, tickets):
+        """
+        tickets: an iterable of (ticket, n) pairs, as for add_ticket
+        """
+        papers = self.papers
+        for ticket, n in tickets:
+            papers[ticket] += n
+
     def __iter__(self):
         return iter(self.papers.items())
 
@@ -655,6 +663,10 @@ class SenateCounter:
     def get_continuing_candidates(self, candidate_aggregates):
         return list(set(self.candidate_ids) - set(self.candidates_elected) - set(self.candidates_excluded))
 
+    def get_continuing_candidate_count(self):
+        "the number of candidates neither elected nor excluded; cheaper than len(get_continuing_candidates(..))"
+        return len(self.candidate_ids) - len(self.candidates_elected) - len(self.candidates_excluded)
+
     def process_round(self):
         first_round = False
         if len(self.round_candidate_aggregates) > 0:
@@ -710,10 +722,13 @@ class SenateCounter:
                 return True
 
             if not self.have_pending_election_distribution() and not self.have_pending_exclusion_distribution():
-                in_the_running = self.get_continuing_candidates(candidate_aggregates)
+                # only build the list of continuing candidates if one of the catch-alls below applies
+                n_running = self.get_continuing_candidate_count()
                 still_to_elect = self.vacancies - len(self.candidates_elected)
+                if n_running == still_to_elect or n_running == 2:
+                    in_the_running = self.get_continuing_candidates(candidate_aggregates)
                 # section 273(18); if we're down to N candidates in the running, with N vacancies, the remaining candidates are elected
-                if len(in_the_running) == still_to_elect:
+                if n_running == still_to_elect:
                     self.results.provision_used(
                         ActProvision("Final %d vacancies filled from last candidates standing, "
                                      "in accordance with section 273(18)." % (still_to_elect)))
@@ -722,7 +737,7 @@ class SenateCounter:
                     return False
                 # section 273(17); if we're down to two candidates in the running, the candidate with the highest number of votes wins - even
                 # if they don't have a quota
-                if len(in_the_running) == 2:
+                if n_running == 2:
                     candidate_a = in_the_running[0]
                     candidate_b = in_the_running[1]
                     candidate_a_votes = candidate_aggregates.get_vote_count(candidate_a)
@@ -6,6 +6,7 @@ The exposed class, BaseResults, is an abstract base class.
 Your implementation should inherit from BaseResults.
 """
 
+import collections
 import datetime
 import json
 import abc
@@ -211,7 +212,8 @@ class JSONResults(BaseResults):
         self.get_candidate_party = get_candidate_party
         self.template_variables = kwargs
 
-        self.aggregates = []
+        # only the current and previous round are needed to report on a round
+        self.aggregates = collections.deque(maxlen=2)
         self.vacancies = None
         self.candidates_affected_by_round = None
         self.rounds = []
@@ -220,18 +222,27 @@ class JSONResults(BaseResults):
         # track events by candidate_id
         self._candidates_elected = {}
         self._candidates_excluded = {}
+        # candidate and party details don't change during the count
+        self._candidate_json = None
+        self._party_json = None
+        # the test log lists candidates in ballot order, which is fixed for the count
+        self._display_titles = [
+            (candidate_id, self.get_candidate_title(candidate_id))
+            for candidate_id in self.candidate_ids_display(None)]
 
     def started(self, vacancies, total_papers, quota):
         self.vacancies = vacancies
         self.total_papers = total_papers
         self.quota = quota
+        self.candidate_json()
+        self.party_json()
 
     def round_begin(self, round_number):
         self.current_round = round_number
         self.candidates_affected_by_round = set()
         self.round_info = {
             'number': round_number,
-            'note': '',
+            'note': [],
             'elected': [],
             'exclusion': None,
             'distribution': None
@@ -256,7 +267,6 @@ class JSONResults(BaseResults):
 
     def candidate_aggregates(self, obj):
         self.aggregates.append(obj)
-        self.json_log(obj)
 
     def candidate_elected(self, obj):
         self._candidates_elected[obj.candidate_id] = (self.current_round, obj)
@@ -287,7 +297,7 @@ class JSONResults(BaseResults):
         self.round_info['exclusion'] = info
 
     def provision_used(self, obj):
-        self.round_info['note'] += obj.text
+        self.round_info['note'].append(obj.text)
 
     def candidate_ids_display(self, candidate_aggregates):
         return sorted(self.candidate_ids, key=self.candidate_order_fn)
@@ -326,8 +336,14 @@ class JSONResults(BaseResults):
         }
 
         if last_candidate_aggregates is not None:
+            after = r['after']
             before = exloss(last_candidate_aggregates)
-            r['delta'] = dict((t, r['after'][t] - before[t]) for t in before)
+            r['delta'] = {
+                'exhausted_papers': after['exhausted_papers'] - before['exhausted_papers'],
+                'exhausted_votes': after['exhausted_votes'] - before['exhausted_votes'],
+                'gain_loss_papers': after['gain_loss_papers'] - before['gain_loss_papers'],
+                'gain_loss_votes': after['gain_loss_votes'] - before['gain_loss_votes'],
+            }
 
         for candidate_id in reversed(sorted(
                 self.candidate_ids,
@@ -347,8 +363,12 @@ class JSONResults(BaseResults):
                         not candidate_aggregates.get_candidate_has_papers(candidate_id):
                     done = True
             if last_candidate_aggregates is not None:
+                after = entry['after']
                 before = agg(last_candidate_aggregates)
-                entry['delta'] = dict((t, entry['after'][t] - before[t]) for t in before)
+                entry['delta'] = {
+                    'votes': after['votes'] - before['votes'],
+                    'papers': after['papers'] - before['papers'],
+                }
             if not done:
                 r['candidates'].append(entry)
         r['total'] = {
@@ -358,7 +378,9 @@ class JSONResults(BaseResults):
         return r
 
     def round_complete(self):
+        self.round_info['note'] = ''.join(self.round_info['note'])
         self.round_info['count'] = self.round_count()
+        self.json_log(self.aggregates[-1])
         self.rounds.append(self.round_info)
 
     def finished(self):
@@ -371,11 +393,7 @@ class JSONResults(BaseResults):
             'excluded': []
         }
 
-        def in_order(l):
-            return enumerate(sorted(l, key=lambda k: l[k]['order']))
-
-        def elected_json(candidate_id):
-            round_number, obj = self._candidates_elected[candidate_id]
+        def elected_json(candidate_id, round_number, obj):
             r = {
                 'id': candidate_id,
                 'round': round_number,
@@ -386,8 +404,7 @@ class JSONResults(BaseResults):
             }
             return r
 
-        def excluded_json(candidate_id):
-            round_number, order, obj = self._candidates_excluded[candidate_id]
+        def excluded_json(candidate_id, round_number, order, obj):
             r = {
                 'id': candidate_id,
                 'round': round_number,
@@ -398,32 +415,34 @@ class JSONResults(BaseResults):
             r.update(obj.reason.info)
             return r
 
-        for candidate_id in sorted(self._candidates_elected, key=lambda x: self._candidates_elected[x][1].order):
-            r['elected'].append(elected_json(candidate_id))
-        for candidate_id in sorted(self._candidates_excluded, key=lambda x: self._candidates_excluded[x][1]):
-            r['excluded'].append(excluded_json(candidate_id))
+        for candidate_id, (round_number, obj) in sorted(self._candidates_elected.items(), key=lambda kv: kv[1][1].order):
+            r['elected'].append(elected_json(candidate_id, round_number, obj))
+        for candidate_id, (round_number, order, obj) in sorted(self._candidates_excluded.items(), key=lambda kv: kv[1][1]):
+            r['excluded'].append(excluded_json(candidate_id, round_number, order, obj))
         return r
 
     def party_json(self):
-        return dict((party, {
-            'name': self.parties[party],
-        }) for party in self.parties)
+        if self._party_json is None:
+            self._party_json = dict((party, {
+                'name': self.parties[party],
+            }) for party in self.parties)
+        return self._party_json
 
     def candidate_json(self):
-        return dict((candidate_id, {
-            'title': self.get_candidate_title(candidate_id),
-            'party': self.get_candidate_party(candidate_id),
-            'id': candidate_id
-        }) for candidate_id in self.candidate_ids)
+        if self._candidate_json is None:
+            self._candidate_json = dict((candidate_id, {
+                'title': self.get_candidate_title(candidate_id),
+                'party': self.get_candidate_party(candidate_id),
+                'id': candidate_id
+            }) for candidate_id in self.candidate_ids)
+        return self._candidate_json
 
     def json_log(self, candidate_aggregates):
         if self.test_log_dir is None:
             return
-        log = []
-        for candidate_id in self.candidate_ids_display(candidate_aggregates):
-            log.append((self.get_candidate_title(candidate_id), candidate_aggregates.get_vote_count(candidate_id)))
+        log = [(title, candidate_aggregates.get_vote_count(candidate_id)) for candidate_id, title in self._display_titles]
         with open(os.path.join(self.test_log_dir, 'round_%d.json' % (self.current_round)), 'w') as fd:
-            json.dump(log, fd)
+            fd.write(json.dumps(log))
 
     def write_json(self):
         params = {
@@ -441,10 +460,13 @@ class JSONResults(BaseResults):
             'rounds': self.rounds,
             'summary': self.summary(),
         }
+        # serialise in one shot (json.dump doesn't use the C encoder), and before opening the
+        # output file, so that a failure doesn't leave a truncated file behind
+        try:
+            data = json.dumps(obj)
+        except TypeError:
+            logger.error("failed to serialise data")
+            logger.error("%s" % (repr(obj)))
+            raise
         with open(self.filename, 'w') as fd:
-            try:
-                json.dump(obj, fd)
-            except TypeError:
-                logger.error("failed to serialise data")
-                logger.error("%s" % (repr(obj)))
-                raise
+            fd.write(data)
@@ -8,26 +8,236 @@ import glob
 import json
 import sys
 import os
-import re
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import repeat
 from pprint import pformat
 from .counter import PapersForCount, SenateCounter
 from .aecdata import CandidateList, SenateATL, SenateBTL, FormalPreferences
+from .aecdata.utils import cached
 from .common import logger
 from .results import JSONResults
 
 
+def box_by_pref(form):
+    """
+    invert `form`: returns a list indexed by preference (1..len(form)), holding the
+    (1-based) index of the box marked with that preference; 0 if no box holds the
+    preference, and -1 if more than one box does
+    """
+    n = len(form)
+    by_pref = [0] * (n + 1)
+    for box, pref in enumerate(form, 1):
+        if pref is None or pref > n:
+            continue
+        by_pref[pref] = -1 if by_pref[pref] else box
+    return by_pref
+
+
+def expand_atl_form(form, group_candidate_ids):
+    """
+    expand an above-the-line form into the candidate IDs it expresses a preference for,
+    in preference order. returns None if no preference is expressed.
+    group_candidate_ids: for each box, a tuple of the candidate IDs in that group which
+    are eligible to receive preferences
+    """
+    # a form with no first preference expresses no preference at all; most informal
+    # forms are caught by this check, without inverting the form
+    if 1 not in form:
+        return None
+    by_pref = box_by_pref(form)
+    prefs = []
+    formal = False
+    for i in range(1, len(form) + 1):
+        box = by_pref[i]
+        if box <= 0:
+            break
+        formal = True
+        prefs.extend(group_candidate_ids[box - 1])
+    if not formal:
+        return None
+    return prefs
+
+
+def expand_btl_form(form, candidate_ids):
+    """
+    expand a below-the-line form into the candidate IDs it expresses a preference for,
+    in preference order. returns None if the form is informal.
+    candidate_ids: for each box, the candidate ID; or None if that candidate is not eligible
+    to receive preferences. formality is determined before this restriction is applied.
+    """
+    # a formal form has at least six boxes marked. most forms are completed above the line,
+    # with no boxes marked below it, so check this before inverting the form
+    if len(form) - form.count(None) < 6:
+        return None
+    by_pref = box_by_pref(form)
+    prefs = []
+    n_prefs = 0
+    for i in range(1, len(form) + 1):
+        box = by_pref[i]
+        if box <= 0:
+            break
+        n_prefs += 1
+        candidate_id = candidate_ids[box - 1]
+        if candidate_id is not None:
+            prefs.append(candidate_id)
+    # must have unique prefs for 1..6, or informal
+    if n_prefs < 6:
+        return None
+    return prefs
+
+
+def restrict_group_candidate_ids(group_candidate_ids, eligible):
+    "restrict each group to the candidates in `eligible`, for use with expand_atl_form"
+    return tuple(
+        tuple(candidate_id for candidate_id in candidate_ids if candidate_id in eligible)
+        for candidate_ids in group_candidate_ids)
+
+
+def restrict_btl_candidate_ids(btl_candidate_ids, eligible):
+    "replace candidates not in `eligible` with None, for use with expand_btl_form"
+    return tuple(
+        candidate_id if candidate_id in eligible else None
+        for candidate_id in btl_candidate_ids)
+
+
+def form_resolver(method, group_candidate_ids, btl_candidate_ids, remove_min_candidates=None):
+    """
+    returns a function, which given the ATL and BTL parts of a form, resolves the formal
+    form to be entered into the count (or None, if the form is informal.)
+    method: None, or one of 's282_restrict_form', 's282_restrict_form_with_savings', 'remove'
+    group_candidate_ids, btl_candidate_ids: lookup tables for expand_atl_form and expand_btl_form,
+    already restricted to the candidates eligible to receive preferences under `method`
+    """
+
+    def resolve_non_s282(atl, btl):
+        "resolve the formal form from ATL and BTL forms. BTL takes precedence, if formal"
+        return expand_btl_form(btl, btl_candidate_ids) or expand_atl_form(atl, group_candidate_ids)
+
+    def resolve_s282_restrict_form(atl, btl):
+        "resolve the formal form as for resolve_non_s282, but restrict to s282 candidates"
+        restricted = expand_btl_form(btl, btl_candidate_ids)
+        if restricted is None:
+            restricted = expand_atl_form(atl, group_candidate_ids)
+        if not restricted:
+            return None
+        return restricted
+
+    def resolve_remove_candidates(atl, btl):
+        "resolve the formal form, removing the listed candidates from eligibiity"
+        restricted = expand_btl_form(btl, btl_candidate_ids)
+        if restricted is not None and remove_min_candidates is not None and len(restricted) < remove_min_candidates:
+            restricted = None
+        if restricted is None:
+            restricted = expand_atl_form(atl, group_candidate_ids) or None
+        return restricted
+
+    def resolve_s282_restrict_form_with_savings(atl, btl):
+        "resolve the formal form as for resolve_non_s282, but restrict to s282 candidates"
+        # if we were formal BTL in a non-s282 count, restrict the form. if at least one
+        # preference, we're formal
+        restricted = expand_btl_form(btl, btl_candidate_ids) or None
+        # if, before or after restriction, we are not formal BTL, try restricting the ATL form
+        if restricted is None:
+            restricted = expand_atl_form(atl, group_candidate_ids) or None
+        return restricted
+
+    return {
+        None: resolve_non_s282,
+        's282_restrict_form': resolve_s282_restrict_form,
+        's282_restrict_form_with_savings': resolve_s282_restrict_form_with_savings,
+        'remove': resolve_remove_candidates,
+    }[method]
+
+
+def decode_forms(raw_forms, atl_n, resolver_args):
+    """
+    expand (raw_form, count) pairs into formal forms to be entered into the count.
+    resolver_args: arguments to `form_resolver`
+    returns a dict mapping each formal form (a tuple of candidate IDs) to the number of
+    ballots cast with that form, and the number of informal ballots.
+
+    this is a module level function, so that it can be run in a worker process.
+    """
+    resolution_fn = form_resolver(*resolver_args)
+    informal_n = 0
+    raw_form = None
+    # many distinct raw forms expand to the same form (eg. a single ATL preference, with
+    # some stray marks); tally them here and enter each form into the count once
+    form_count = defaultdict(int)
+    # the (extremely) busy loop reading preferences and expanding them into
+    # forms to be entered into the count
+    for raw_form, count in raw_forms:
+        atl = raw_form[:atl_n]
+        btl = raw_form[atl_n:]
+        form = resolution_fn(atl, btl)
+        if form is not None:
+            form_count[tuple(form)] += count
+        else:
+            informal_n += count
+    # slightly paranoid check, but outside the busy loop
+    if raw_form is not None:
+        assert(len(raw_form) == atl_n + len(resolver_args[2]))
+    return form_count, informal_n
+
+
+def run_in_worker(log_level, fn, *args):
+    """
+    call fn(*args) in a worker process, with the log level of the parent process. a worker
+    started with spawn or forkserver re-imports this module, and so doesn't inherit the level
+    set from the command line. (ProcessPoolExecutor's initializer needs Python 3.7.)
+    """
+    logger.setLevel(log_level)
+    return fn(*args)
+
+
+def chunked(iterable, size):
+    "split iterable into lists of (at most) `size` items"
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def load_candidates(state_name, get_input_file, cache_dir):
+    """
+    read the candidate list for `state_name`, cached in `cache_dir`. returns the candidate list,
+    and get_candidate_title(), get_candidate_order() and get_candidate_party() functions for it.
+    these are bound directly to lookup dicts: they are called for each candidate, in every round
+    of the count.
+    """
+    candidate_files = [get_input_file('all-candidates'), get_input_file('senate-candidates')]
+    candidates = cached(
+        cache_dir, 'candidates-%s' % (state_name), candidate_files,
+        lambda: CandidateList(state_name, *candidate_files))
+    title, order, party = {}, {}, {}
+    for c in candidates.candidates:
+        title[c.candidate_id] = "{}, {}".format(c.surname, c.given_name)
+        order[c.candidate_id] = c.candidate_order
+        party[c.candidate_id] = c.party_abbreviation
+    return candidates, title.__getitem__, order.__getitem__, party.__getitem__
+
+
 class SenateCountPost2015:
     disable_bulk_exclusions = True
+    # number of distinct raw forms sent to a worker process at a time, when decoding in parallel
+    decode_chunk_size = 100000
 
     def __init__(self, state_name, get_input_file, **kwargs):
-        self.candidates = CandidateList(state_name,
-                                        get_input_file('all-candidates'),
-                                        get_input_file('senate-candidates'))
+        self.cache_dir = kwargs.get('cache_dir')
+        self.candidates, self.get_candidate_title, self.get_candidate_order, self.get_candidate_party = \
+            load_candidates(state_name, get_input_file, self.cache_dir)
         self.tickets_for_count = PapersForCount()
 
-        self.s282_candidates = kwargs.get('s282_candidates')
+        s282_candidates = kwargs.get('s282_candidates')
+        self.s282_candidates = frozenset(s282_candidates) if s282_candidates else None
         self.s282_method = kwargs.get('s282_method')
         self.max_ballots = kwargs['max_ballots'] if 'max_ballots' in kwargs else None
+        self.jobs = kwargs.get('jobs') or 1
 
         self.remove_candidates = None
         self.remove_method = kwargs.get('remove_method')
@@ -39,131 +249,77 @@ class SenateCountPost2015:
             if self.remove_atl_only is None:
                 self.remove_atl_only = [False for t in self.remove_candidates]
 
-        def atl_flow(form):
-            by_pref = {}
-            for pref, group in zip(form, self.candidates.groups):
-                if pref is None:
-                    continue
-                if pref not in by_pref:
-                    by_pref[pref] = []
-                by_pref[pref].append(group)
-            prefs = []
-            for i in range(1, len(form) + 1):
-                at_pref = by_pref.get(i)
-                if not at_pref or len(at_pref) != 1:
-                    break
-                the_pref = at_pref[0]
-                for candidate in the_pref.candidates:
-                    candidate_id = candidate.candidate_id
-                    prefs.append(candidate_id)
-            if not prefs:
-                return None
-            return prefs
-
-        def btl_flow(form):
-            by_pref = {}
-            for pref, candidate in zip(form, self.candidates.candidates):
-                if pref is None:
-                    continue
-                if pref not in by_pref:
-                    by_pref[pref] = []
-                by_pref[pref].append(candidate.candidate_id)
-            prefs = []
-            for i in range(1, len(form) + 1):
-                at_pref = by_pref.get(i)
-                if not at_pref or len(at_pref) != 1:
-                    break
-                candidate_id = at_pref[0]
-                prefs.append(candidate_id)
-            # must have unique prefs for 1..6, or informal
-            if len(prefs) < 6:
-                return None
-            return prefs
-
-        def resolve_non_s282(atl, btl):
-            "resolve the formal form from ATL and BTL forms. BTL takes precedence, if formal"
-            return btl_flow(btl) or atl_flow(atl)
-
-        def resolve_s282_restrict_form(atl, btl):
-            "resolve the formal form as for resolve_non_s282, but restrict to s282 candidates"
-            expanded = btl_flow(btl) or atl_flow(atl)
-            restricted = [candidate_id for candidate_id in expanded if candidate_id in self.s282_candidates]
-            if len(restricted) == 0:
-                return None
-            return restricted
-
-        def resolve_remove_candidates(atl, btl, min_candidates):
-            "resolve the formal form, removing the listed candidates from eligibiity"
-            restricted = None
-            btl_expanded = btl_flow(btl)
-            if btl_expanded:
-                btl_remove = [t for (t, atl_only) in zip(self.remove_candidates, self.remove_atl_only) if not atl_only]
-                restricted = [candidate_id for candidate_id in btl_expanded if candidate_id not in btl_remove]
-                if min_candidates is not None and len(restricted) < min_candidates:
-                    restricted = None
-            if restricted is None:
-                atl_expanded = atl_flow(atl)
-                if atl_expanded:
-                    restricted = [candidate_id for candidate_id in atl_expanded if candidate_id not in self.remove_candidates]
-                    if len(restricted) == 0:
-                        restricted = None
-            return restricted
-
-        def resolve_s282_restrict_form_with_savings(atl, btl):
-            "resolve the formal form as for resolve_non_s282, but restrict to s282 candidates"
-            restricted = None
-            # if we were formal BTL in a non-s282 count, restrict the form. if at least one
-            # preference, we're formal
-            btl_expanded = btl_flow(btl)
-            if btl_expanded:
-                restricted = [candidate_id for candidate_id in btl_expanded if candidate_id in self.s282_candidates]
-                if len(restricted) == 0:
-                    restricted = None
-            # if, before or after restriction, we are not formal BTL, try restricting the ATL form
-            if restricted is None:
-                atl_expanded = atl_flow(atl)
-                if atl_expanded:
-                    restricted = [candidate_id for candidate_id in atl_expanded if candidate_id in self.s282_candidates]
-                    if len(restricted) == 0:
-                        restricted = None
-            return restricted
+        # flat lookup tables, by box, of the candidate IDs each box on the ballot paper refers to
+        self.group_candidate_ids = tuple(
+            tuple(candidate.candidate_id for candidate in group.candidates)
+            for group in self.candidates.groups)
+        self.btl_candidate_ids = tuple(candidate.candidate_id for candidate in self.candidates.candidates)
 
         atl_n = len(self.candidates.groups)
         btl_n = len(self.candidates.candidates)
         assert(atl_n > 0 and btl_n > 0)
-        informal_n = 0
-        n_ballots = 0
-        resolution_fn = resolve_non_s282
+        method = None
+        # the restrictions of the form are applied to the lookup tables once, here, rather
+        # than as each form is expanded
+        group_candidate_ids, btl_candidate_ids = self.group_candidate_ids, self.btl_candidate_ids
         if self.s282_candidates:
             if self.s282_method == 'restrict_form':
-                resolution_fn = resolve_s282_restrict_form
+                method = 's282_restrict_form'
             elif self.s282_method == 'restrict_form_with_savings':
-                resolution_fn = resolve_s282_restrict_form_with_savings
+                method = 's282_restrict_form_with_savings'
             else:
                 raise Exception("unknown s282 method: `%s'" % (self.s282_method))
+            group_candidate_ids = restrict_group_candidate_ids(self.group_candidate_ids, self.s282_candidates)
+            btl_candidate_ids = restrict_btl_candidate_ids(self.btl_candidate_ids, self.s282_candidates)
+        # the minimum number of candidates for a BTL form to remain formal after removal
+        remove_min_candidates = None
         if self.remove_candidates:
             if self.remove_method == 'relaxed':
-                resolution_fn = lambda atl, btl: resolve_remove_candidates(atl, btl, None)
+                method = 'remove'
             elif self.remove_method == 'strict':
-                resolution_fn = lambda atl, btl: resolve_remove_candidates(atl, btl, 6)
-        # the (extremely) busy loop reading preferences and expanding them into
-        # forms to be entered into the count
-        for raw_form, count in FormalPreferences(get_input_file('formal-preferences'), atl_n, btl_n):
-            if self.max_ballots and n_ballots >= self.max_ballots:
-                break
-            atl = raw_form[:atl_n]
-            btl = raw_form[atl_n:]
-            form = resolution_fn(atl, btl)
-            if form is not None:
-                self.tickets_for_count.add_ticket(tuple(form), count)
-            else:
-                informal_n += count
-            n_ballots += count
-        # slightly paranoid check, but outside the busy loop
-        assert(len(raw_form) == atl_n + btl_n)
+                remove_min_candidates = 6
+                method = 'remove'
+        if method == 'remove':
+            btl_remove = [t for (t, atl_only) in zip(self.remove_candidates, self.remove_atl_only) if not atl_only]
+            btl_remove_eligible = frozenset(self.btl_candidate_ids) - frozenset(btl_remove)
+            atl_remove_eligible = frozenset(self.btl_candidate_ids) - frozenset(self.remove_candidates)
+            group_candidate_ids = restrict_group_candidate_ids(self.group_candidate_ids, atl_remove_eligible)
+            btl_candidate_ids = restrict_btl_candidate_ids(self.btl_candidate_ids, btl_remove_eligible)
+        resolver_args = (method, group_candidate_ids, btl_candidate_ids, remove_min_candidates)
+
+        preferences_file = get_input_file('formal-preferences')
+
+        def decode():
+            raw_forms = FormalPreferences(preferences_file, atl_n, btl_n, self.cache_dir, self.max_ballots or None)
+            if self.jobs > 1:
+                return self._decode_parallel(raw_forms, atl_n, resolver_args)
+            return decode_forms(raw_forms, atl_n, resolver_args)
+
+        # the tally of forms depends upon the input files, and everything which restricts the form
+        decode_params = (state_name, resolver_args, self.max_ballots)
+        decode_files = [get_input_file('all-candidates'), get_input_file('senate-candidates'), preferences_file]
+        form_count, informal_n = cached(
+            self.cache_dir, 'papers-%s' % (state_name), decode_files, decode, params=decode_params)
+        self.tickets_for_count.add_tickets(form_count.items())
         if informal_n > 0:
             logger.info("%d ballots are informal and were excluded from the count" % (informal_n))
 
+    def _decode_parallel(self, raw_forms, atl_n, resolver_args):
+        """
+        decode forms in chunks, across `self.jobs` worker processes. the chunk results are
+        merged in the order the forms were read, so the count is identical to a serial decode.
+        """
+        form_count = defaultdict(int)
+        informal_n = 0
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            for chunk_form_count, chunk_informal_n in executor.map(
+                    run_in_worker, repeat(logger.level), repeat(decode_forms),
+                    chunked(raw_forms, self.decode_chunk_size), repeat(atl_n), repeat(resolver_args)):
+                for form, count in chunk_form_count.items():
+                    form_count[form] += count
+                informal_n += chunk_informal_n
+        return form_count, informal_n
+
     def get_papers_for_count(self):
         return self.tickets_for_count
 
@@ -172,7 +328,7 @@ class SenateCountPost2015:
         if self.s282_candidates:
             candidate_ids = [t for t in candidate_ids if t in self.s282_candidates]
         if self.remove_candidates:
-            strip_candidates = [t for (t, atl_only) in zip(self.remove_candidates, self.remove_atl_only) if not atl_only]
+            strip_candidates = frozenset(t for (t, atl_only) in zip(self.remove_candidates, self.remove_atl_only) if not atl_only)
             candidate_ids = [t for t in candidate_ids if t not in strip_candidates]
         return candidate_ids
 
@@ -180,16 +336,6 @@ class SenateCountPost2015:
         return dict((c.party_abbreviation, c.party_name)
                     for c in self.candidates.candidates)
 
-    def get_candidate_title(self, candidate_id):
-        c = self.candidates.candidate_by_id[candidate_id]
-        return "{}, {}".format(c.surname, c.given_name)
-
-    def get_candidate_order(self, candidate_id):
-        return self.candidates.candidate_by_id[candidate_id].candidate_order
-
-    def get_candidate_party(self, candidate_id):
-        return self.candidates.candidate_by_id[candidate_id].party_abbreviation
-
 
 class SenateCountPre2015:
     disable_bulk_exclusions = False
@@ -198,23 +344,27 @@ class SenateCountPre2015:
         if 's282_recount' in kwargs:
             raise Exception('s282 recount not implemented for pre2015 data')
 
-        self.candidates = CandidateList(state_name,
-                                        get_input_file('all-candidates'),
-                                        get_input_file('senate-candidates'))
-        self.atl = SenateATL(
-            state_name,
-            get_input_file('group-voting-tickets'),
-            get_input_file('first-preferences'))
-        self.btl = SenateBTL(get_input_file('btl-preferences'))
+        self.cache_dir = kwargs.get('cache_dir')
+        self.candidates, self.get_candidate_title, self.get_candidate_order, self.get_candidate_party = \
+            load_candidates(state_name, get_input_file, self.cache_dir)
+        # the parsed ATL and BTL data are only needed to build the papers for the count; they
+        # aren't held on to, so they are freed before the count is run
+        atl_files = [get_input_file('group-voting-tickets'), get_input_file('first-preferences')]
+        atl = cached(
+            self.cache_dir, 'atl-%s' % (state_name), atl_files,
+            lambda: SenateATL(state_name, *atl_files))
+        btl_file = get_input_file('btl-preferences')
+        btl = cached(
+            self.cache_dir, 'btl-%s' % (state_name), [btl_file],
+            lambda: SenateBTL(btl_file))
 
         def load_tickets(ticket_obj):
             if ticket_obj is None:
                 return
-            for form, n in ticket_obj.get_tickets():
-                self.tickets_for_count.add_ticket(form, n)
+            self.tickets_for_count.add_tickets(ticket_obj.get_tickets())
         self.tickets_for_count = PapersForCount()
-        load_tickets(self.atl)
-        load_tickets(self.btl)
+        load_tickets(atl)
+        load_tickets(btl)
 
     def get_papers_for_count(self):
         return self.tickets_for_count
@@ -226,57 +376,94 @@ class SenateCountPre2015:
         return dict((c.party_abbreviation, c.party_name)
                     for c in self.candidates.candidates)
 
-    def get_candidate_title(self, candidate_id):
-        c = self.candidates.candidate_by_id[candidate_id]
-        return "{}, {}".format(c.surname, c.given_name)
-
-    def get_candidate_order(self, candidate_id):
-        return self.candidates.candidate_by_id[candidate_id].candidate_order
 
-    def get_candidate_party(self, candidate_id):
-        return self.candidates.candidate_by_id[candidate_id].party_abbreviation
+def first_difference(a, b, path=()):
+    """
+    find the first point at which the JSON values `a` and `b` differ. returns None if they
+    are equal, otherwise (path, value in a, value in b); path being the keys and indices
+    leading to the difference. a missing key or index has the value None.
+    """
+    if isinstance(a, dict) and isinstance(b, dict):
+        for k in sorted(set(a) | set(b), key=str):
+            if k not in a or k not in b:
+                return path + (k,), a.get(k), b.get(k)
+            difference = first_difference(a[k], b[k], path + (k,))
+            if difference is not None:
+                return difference
+        return None
+    if isinstance(a, list) and isinstance(b, list):
+        for idx, (a_item, b_item) in enumerate(zip(a, b)):
+            difference = first_difference(a_item, b_item, path + (idx,))
+            if difference is not None:
+                return difference
+        if len(a) != len(b):
+            idx = min(len(a), len(b))
+            return path + (idx,), a[idx] if idx < len(a) else None, b[idx] if idx < len(b) else None
+        return None
+    if a != b:
+        return path, a, b
+    return None
 
 
 def verify_test_logs(verified_dir, test_log_dir):
-    test_re = re.compile(r'^round_(\d+)\.json')
-    rounds = []
-    for fname in os.listdir(verified_dir):
-        m = test_re.match(fname)
-        if m:
-            rounds.append(int(m.groups()[0]))
+    def round_logs(d):
+        "the round numbers and paths of the round logs (round_<n>.json) in `d`"
+        for entry in os.scandir(d):
+            name = entry.name
+            if not name.startswith('round_') or not name.endswith('.json'):
+                continue
+            idx = name[6:-5]
+            if idx.isdecimal():
+                yield int(idx), entry.path
+
+    rounds = [idx for idx, _ in round_logs(verified_dir)]
 
     def fname(d, r):
         return os.path.join(d, 'round_%d.json' % r)
 
-    def getlog(d, r):
+    def getraw(d, r):
         try:
-            with open(fname(d, r)) as fd:
-                return json.load(fd)
+            with open(fname(d, r), 'rb') as fd:
+                return fd.read()
         except FileNotFoundError:
+            return None
+
+    def parse(raw):
+        if raw is None:
             return {}
+        return json.loads(raw.decode('utf8'))
     ok = True
     for idx in sorted(rounds):
-        v = getlog(verified_dir, idx)
-        t = getlog(test_log_dir, idx)
-        if v != t:
+        v_raw = getraw(verified_dir, idx)
+        t_raw = getraw(test_log_dir, idx)
+        # logs are almost always byte-for-byte identical; only parse them if not
+        if v_raw is not None and v_raw == t_raw:
+            logger.debug("Round %d: OK" % (idx))
+            continue
+        v = parse(v_raw)
+        t = parse(t_raw)
+        difference = first_difference(v, t)
+        if difference is not None:
             logger.error("Round %d: FAIL" % (idx))
-            logger.error("Log should be:")
-            logger.error(pformat(v))
-            logger.error("Log is:")
-            logger.error(pformat(t))
-            logger.error("Diff:")
-            logger.error(
-                '\n'.join(
-                    difflib.unified_diff(
-                        pformat(v).split('\n'),
-                        pformat(t).split('\n'))))
+            logger.error("First difference at %s: log should have %r, log has %r", *difference)
+            # the complete logs, and a diff of them, can be large: only produce them if debugging
+            if logger.isEnabledFor(logging.DEBUG):
+                v_fmt = pformat(v)
+                t_fmt = pformat(t)
+                logger.debug("Log should be:\n%s", v_fmt)
+                logger.debug("Log is:\n%s", t_fmt)
+                logger.debug(
+                    "Diff:\n%s",
+                    '\n'.join(
+                        difflib.unified_diff(
+                            v_fmt.split('\n'),
+                            t_fmt.split('\n'))))
             ok = False
         else:
             logger.debug("Round %d: OK" % (idx))
     if ok and len(rounds) > 0:
-        for fname in os.listdir(test_log_dir):
-            if test_re.match(fname):
-                os.unlink(os.path.join(test_log_dir, fname))
+        for _, path in list(round_logs(test_log_dir)):
+            os.unlink(path)
         os.rmdir(test_log_dir)
     return ok
 
@@ -304,7 +491,7 @@ def write_angular_json(config, out_dir):
             'description': count['description'],
             'path': count['shortname']}
             for count in config['count']]
-        json.dump(obj, fd, sort_keys=True)
+        fd.write(json.dumps(obj, sort_keys=True))
 
 
 def get_data(input_cls, base_dir, count, **kwargs):
@@ -332,24 +519,25 @@ class Automation:
 
     def _qstr(self, question):
         "we need to cope with a list, or a list of lists"
-        parts = []
-        for entry in question:
-            if type(entry) is list:
-                parts.append(self._qstr(entry))
-            else:
-                parts.append('"%s"<%d>' % (self._count_data.get_candidate_title(entry), entry))
-        return ', '.join(parts)
+        get_candidate_title = self._count_data.get_candidate_title
+        return ', '.join(
+            self._qstr(entry) if isinstance(entry, list) else '"%s"<%d>' % (get_candidate_title(entry), entry)
+            for entry in question)
 
     def create_callback(self):
         """
         create a callback, suitable to be passed to SenateCounter
         """
+        data = self._data
+        n_data = len(data)
+
         def __callback(question_posed):
-            logger.debug("%s: asked to choose between: %s" % (self._name, self._qstr(question_posed)))
-            if self._upto == len(self._data):
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("%s: asked to choose between: %s" % (self._name, self._qstr(question_posed)))
+            if self._upto >= n_data:
                 logger.error("%s: out of automation data, requested to pick between %s" % (self._name, self._qstr(question_posed)))
                 raise AutomationException("out of automation data")
-            question_archived, answer = self._data[self._upto]
+            question_archived, answer = data[self._upto]
             if question_archived != question_posed:
                 logger.error("%s: automation data mismatch, expected question `%s', got question `%s'" % (self._name, self._qstr(question_archived), self._qstr(question_posed)))
             resp = question_posed.index(answer)
@@ -444,9 +632,8 @@ def s282_options(out_dir, count, written):
     if fname not in written:
         logger.error("error: `%s' needed for s282 recount has not been calculated during this dividebatur run." % (fname))
         sys.exit(1)
-    with open(fname) as fd:
-        data = json.load(fd)
-    options['s282_candidates'] = [t['id'] for t in data['summary']['elected']]
+    # the summary of the count is kept in `written`, so we needn't re-read it from disk
+    options['s282_candidates'] = [t['id'] for t in written[fname]['elected']]
     return options
 
 
@@ -481,6 +668,12 @@ def parse_args():
     parser.add_argument(
         '--max-ballots',
         type=int, help="Maximum number of ballots to read")
+    parser.add_argument(
+        '--jobs',
+        type=int, help="Number of worker processes: used to run counts in parallel, or to decode preferences if running a single count")
+    parser.add_argument(
+        '--cache-dir',
+        type=str, help="Cache parsed input data in this directory, to speed up later runs")
     parser.add_argument(
         '--only',
         type=str, help="Only run the count with this shortname")
@@ -498,7 +691,57 @@ def parse_args():
     return parser.parse_args()
 
 
-def execute_counts(out_dir, config_file, only, only_verified, max_ballots=None):
+def run_count(count, base_dir, out_dir, count_options):
+    """
+    read the data for, and determine the outcome of, a single count. returns the output
+    file written, and the summary of the count.
+
+    this is a module level function, so that it can be run in a worker process.
+    """
+    aec_data_config = count['aec-data']
+    data_format = aec_data_config['format']
+    input_cls = get_input_method(data_format)
+    check_counting_method_valid(input_cls, data_format)
+    logger.debug("reading data for count: `%s'" % (count['name']))
+    data = get_data(input_cls, base_dir, count, **count_options)
+    logger.debug("determining outcome for count: `%s'" % (count['name']))
+    return get_outcome(count, data, base_dir, out_dir)
+
+
+def run_counts_parallel(counts, base_dir, out_dir, get_count_options, written, jobs):
+    """
+    run `counts` across `jobs` worker processes. a count which is an s282 recount of another
+    count is only started once that count has finished.
+    """
+    def recount_from(count):
+        s282_config = count.get('s282')
+        if s282_config:
+            return s282_config.get('recount_from')
+
+    pending = list(counts)
+    running = {}
+    with ProcessPoolExecutor(max_workers=min(jobs, len(counts))) as executor:
+        while pending or running:
+            # counts which precede each pending count, and haven't finished
+            unfinished = set(count['shortname'] for count in running.values())
+            blocked = []
+            for count in pending:
+                if recount_from(count) in unfinished:
+                    blocked.append(count)
+                else:
+                    future = executor.submit(
+                        run_in_worker, logger.level, run_count, count, base_dir, out_dir, get_count_options(count))
+                    running[future] = count
+                unfinished.add(count['shortname'])
+            pending = blocked
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+                outf, summary = future.result()
+                written[outf] = summary
+
+
+def execute_counts(out_dir, config_file, only, only_verified, max_ballots=None, jobs=None, cache_dir=None):
     base_dir = os.path.dirname(os.path.abspath(config_file))
     config = read_config(config_file)
     if not check_config(config):
@@ -507,26 +750,37 @@ def execute_counts(out_dir, config_file, only, only_verified, max_ballots=None):
     # global config for the angular frontend
     cleanup_json(out_dir)
     write_angular_json(config, out_dir)
-    written = set()
+    # output file -> summary of the count written to it
+    written = {}
+    counts = []
     for count in config['count']:
         if only is not None and count['shortname'] != only:
             continue
         if only_verified and 'verified' not in count:
             continue
-        aec_data_config = count['aec-data']
-        data_format = aec_data_config['format']
-        input_cls = get_input_method(data_format)
-        check_counting_method_valid(input_cls, data_format)
+        counts.append(count)
+    # with more than one count to run, run the counts in parallel; otherwise, parallelise
+    # the decoding of the preferences for the single count
+    parallel_counts = jobs is not None and jobs > 1 and len(counts) > 1
+
+    def get_count_options(count):
         count_options = {}
         count_options.update(s282_options(out_dir, count, written))
         count_options.update(remove_candidates_options(count))
         if max_ballots is not None:
             count_options.update({'max_ballots': max_ballots})
-        logger.debug("reading data for count: `%s'" % (count['name']))
-        data = get_data(input_cls, base_dir, count, **count_options)
-        logger.debug("determining outcome for count: `%s'" % (count['name']))
-        outf, _ = get_outcome(count, data, base_dir, out_dir)
-        written.add(outf)
+        if jobs is not None and not parallel_counts:
+            count_options.update({'jobs': jobs})
+        if cache_dir is not None:
+            count_options.update({'cache_dir': cache_dir})
+        return count_options
+
+    if parallel_counts:
+        run_counts_parallel(counts, base_dir, out_dir, get_count_options, written, jobs)
+        return
+    for count in counts:
+        outf, summary = run_count(count, base_dir, out_dir, get_count_options(count))
+        written[outf] = summary
 
 
 def main():
@@ -535,7 +789,7 @@ def main():
         logger.setLevel(logging.ERROR)
     elif args.verbose:
         logger.setLevel(logging.DEBUG)
-    execute_counts(args.out_dir, args.config_file, args.only, args.only_verified, max_ballots=args.max_ballots)
+    execute_counts(args.out_dir, args.config_file, args.only, args.only_verified, max_ballots=args.max_ballots, jobs=args.jobs, cache_dir=args.cache_dir)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,104 @@
+import os
+import pickle
+import shutil
+import tempfile
+
+from ..aecdata.utils import cached
+
+
+class Loader:
+    "returns `value`, counting the number of times it has been called"
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def with_cache_dir(fn):
+    def wrapper():
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            input_file = os.path.join(tmp_dir, 'input.csv')
+            with open(input_file, 'w') as fd:
+                fd.write('a,b\n1,2\n')
+            fn(os.path.join(tmp_dir, 'cache'), input_file)
+        finally:
+            shutil.rmtree(tmp_dir)
+    wrapper.__name__ = fn.__name__
+    return wrapper
+
+
+def cache_entries(cache_dir):
+    return sorted(os.listdir(cache_dir))
+
+
+@with_cache_dir
+def test_no_cache_dir(cache_dir, input_file):
+    loader = Loader([1, 2])
+    assert(cached(None, 'test', [input_file], loader) == [1, 2])
+    assert(cached(None, 'test', [input_file], loader) == [1, 2])
+    assert(loader.calls == 2)
+    assert(not os.path.exists(cache_dir))
+
+
+@with_cache_dir
+def test_miss_then_hit(cache_dir, input_file):
+    loader = Loader({'a': (1, 2)})
+    assert(cached(cache_dir, 'test', [input_file], loader) == {'a': (1, 2)})
+    assert(cached(cache_dir, 'test', [input_file], loader) == {'a': (1, 2)})
+    assert(loader.calls == 1)
+    entries = cache_entries(cache_dir)
+    assert(len(entries) == 1 and entries[0].endswith('.pickle'))
+
+
+@with_cache_dir
+def test_input_changed(cache_dir, input_file):
+    loader = Loader(1)
+    cached(cache_dir, 'test', [input_file], loader)
+    with open(input_file, 'a') as fd:
+        fd.write('3,4\n')
+    cached(cache_dir, 'test', [input_file], loader)
+    assert(loader.calls == 2)
+    assert(len(cache_entries(cache_dir)) == 2)
+
+
+@with_cache_dir
+def test_params_changed(cache_dir, input_file):
+    loader = Loader(1)
+    cached(cache_dir, 'test', [input_file], loader, params=(1,))
+    cached(cache_dir, 'test', [input_file], loader, params=(2,))
+    cached(cache_dir, 'test', [input_file], loader, params=(1,))
+    assert(loader.calls == 2)
+
+
+@with_cache_dir
+def test_corrupt_entry(cache_dir, input_file):
+    loader = Loader([1, 2, 3])
+    cached(cache_dir, 'test', [input_file], loader)
+    entry, = cache_entries(cache_dir)
+    entry_path = os.path.join(cache_dir, entry)
+    for damaged in (b'', b'not a pickle', pickle.dumps([1, 2, 3])[:5]):
+        with open(entry_path, 'wb') as fd:
+            fd.write(damaged)
+        assert(cached(cache_dir, 'test', [input_file], loader) == [1, 2, 3])
+    assert(loader.calls == 4)
+    # the entry has been rewritten, and no temporary files are left behind
+    assert(cache_entries(cache_dir) == [entry])
+    assert(cached(cache_dir, 'test', [input_file], loader) == [1, 2, 3])
+    assert(loader.calls == 4)
+
+
+@with_cache_dir
+def test_unloadable_entry(cache_dir, input_file):
+    loader = Loader('value')
+    cached(cache_dir, 'test', [input_file], loader)
+    entry, = cache_entries(cache_dir)
+    # a pickle referring to a class which no longer exists
+    with open(os.path.join(cache_dir, entry), 'wb') as fd:
+        fd.write(b'cdividebatur.aecdata.utils\nNoSuchClass\n.')
+    assert(cached(cache_dir, 'test', [input_file], loader) == 'value')
+    assert(loader.calls == 2)
@@ -0,0 +1,21 @@
+from ..senatecount import first_difference
+
+
+def test_equal():
+    assert(first_difference([['A', 1], ['B', 2]], [['A', 1], ['B', 2]]) is None)
+
+
+def test_list_value():
+    assert(first_difference([['A', 1], ['B', 2]], [['A', 1], ['B', 3]]) == ((1, 1), 2, 3))
+
+
+def test_list_length():
+    assert(first_difference([1, 2], [1, 2, 3]) == ((2,), None, 3))
+
+
+def test_dict_missing_key():
+    assert(first_difference({'a': 1}, {'a': 1, 'b': 2}) == (('b',), None, 2))
+
+
+def test_type_mismatch():
+    assert(first_difference({}, [1]) == ((), {}, [1]))
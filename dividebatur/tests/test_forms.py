@@ -0,0 +1,94 @@
+from ..senatecount import box_by_pref, expand_atl_form, expand_btl_form, form_resolver
+
+# three groups of two candidates above the line; those six, and two ungrouped candidates, below
+GROUPS = ((1, 2), (3, 4), (5, 6))
+BTL = (1, 2, 3, 4, 5, 6, 7, 8)
+_ = None
+
+
+def test_box_by_pref():
+    assert(box_by_pref((2, _, 1)) == [0, 3, 1, 0])
+
+
+def test_box_by_pref_duplicate():
+    assert(box_by_pref((1, 1, 2)) == [0, -1, 3, 0])
+
+
+def test_box_by_pref_out_of_range():
+    assert(box_by_pref((1, 5)) == [0, 1, 0])
+
+
+def test_atl():
+    assert(expand_atl_form((2, 1, _), GROUPS) == [3, 4, 1, 2])
+    assert(expand_atl_form((1, 2, 3), GROUPS) == [1, 2, 3, 4, 5, 6])
+
+
+def test_atl_informal():
+    assert(expand_atl_form((_, _, _), GROUPS) is None)
+    assert(expand_atl_form((_, 2, 3), GROUPS) is None)
+    assert(expand_atl_form((1, 1, 2), GROUPS) is None)
+
+
+def test_atl_gap():
+    assert(expand_atl_form((1, 3, _), GROUPS) == [1, 2])
+
+
+def test_atl_duplicate():
+    assert(expand_atl_form((1, 2, 2), GROUPS) == [1, 2])
+
+
+def test_btl():
+    assert(expand_btl_form((6, 5, 4, 3, 2, 1, _, _), BTL) == [6, 5, 4, 3, 2, 1])
+    assert(expand_btl_form((1, 2, 3, 4, 5, 6, 7, 8), BTL) == [1, 2, 3, 4, 5, 6, 7, 8])
+
+
+def test_btl_informal():
+    assert(expand_btl_form((_,) * 8, BTL) is None)
+    assert(expand_btl_form((1, 2, 3, 4, 5, _, _, _), BTL) is None)
+
+
+def test_btl_gap():
+    assert(expand_btl_form((1, 2, 3, 5, 6, 7, _, _), BTL) is None)
+    assert(expand_btl_form((1, 2, 3, 4, 5, 6, 8, _), BTL) == [1, 2, 3, 4, 5, 6])
+
+
+def test_btl_duplicate():
+    assert(expand_btl_form((1, 2, 3, 3, 4, 5, 6, 7), BTL) is None)
+    assert(expand_btl_form((1, 2, 3, 4, 5, 6, 7, 7), BTL) == [1, 2, 3, 4, 5, 6])
+
+
+def test_btl_restricted():
+    # formality is determined before the restriction is applied
+    restricted = (1, _, 3, 4, 5, 6, 7, 8)
+    assert(expand_btl_form((1, 2, 3, 4, 5, 6, _, _), restricted) == [1, 3, 4, 5, 6])
+
+
+def test_resolve_btl_precedence():
+    resolve = form_resolver(None, GROUPS, BTL)
+    assert(resolve((1, 2, 3), (6, 5, 4, 3, 2, 1, _, _)) == [6, 5, 4, 3, 2, 1])
+
+
+def test_resolve_btl_fallback_to_atl():
+    resolve = form_resolver(None, GROUPS, BTL)
+    assert(resolve((2, 1, _), (1, 2, 3, 4, 5, _, _, _)) == [3, 4, 1, 2])
+    assert(resolve((2, 1, _), (1, 2, 3, 3, 4, 5, 6, 7)) == [3, 4, 1, 2])
+
+
+def test_resolve_informal():
+    resolve = form_resolver(None, GROUPS, BTL)
+    assert(resolve((_, _, _), (1, 2, 3, 4, 5, _, _, _)) is None)
+
+
+def test_resolve_s282_restrict_form():
+    # only candidates 3 and 4 are eligible
+    resolve = form_resolver('s282_restrict_form', ((), (3, 4), ()), (_, _, 3, 4, _, _, _, _))
+    assert(resolve((1, _, _), (6, 5, 4, 3, 2, 1, _, _)) == [4, 3])
+    # a formal ATL form which expresses no preference for an eligible candidate is informal
+    assert(resolve((1, _, _), (_,) * 8) is None)
+
+
+def test_resolve_remove_min_candidates():
+    # candidate 2 removed: a BTL form left with fewer than six preferences falls back to ATL
+    resolve = form_resolver('remove', ((1,), (3, 4), (5, 6)), (1, _, 3, 4, 5, 6, 7, 8), remove_min_candidates=6)
+    assert(resolve((2, 1, _), (1, 2, 3, 4, 5, 6, _, _)) == [3, 4, 1])
+    assert(resolve((2, 1, _), (1, 2, 3, 4, 5, 6, 7, _)) == [1, 3, 4, 5, 6, 7])